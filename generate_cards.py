@@ -3,11 +3,28 @@ Created by Nik and the Cursor AI Assistant
 A script to generate high-resolution playing cards from CSV data
 """
 
+import io
 import os
 import csv
 from PIL import Image, ImageDraw, ImageFont
-import multiprocessing
-from functools import partial
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from itertools import chain
+
+try:
+    import numpy as np
+except ImportError:
+    np = None  # Optional - falls back to PIL's paste
+
+try:
+    import oxipng
+except ImportError:
+    oxipng = None  # Optional - Pillow's PNG output is written as-is
+
+try:
+    import pandas as pd
+except ImportError:
+    pd = None  # Optional - falls back to the stdlib csv reader
 
 # Card Dimensions (in pixels at 1200 DPI)
 DPI = 1200
@@ -28,122 +45,239 @@ FONT_SIZE_MAIN = 72  # Increased size for better visibility
 FONT_SIZE_NUMBER = 48  # Increased size for card numbers
 MAIN_FONT = "Bitter-Bold.ttf"
 
+# PNG encoding - low zlib level trades a little file size for much faster saves
+PNG_COMPRESS_LEVEL = 1
+
+# Opt-in: repack batch PNGs through pyoxipng to shrink the files the low
+# zlib level leaves behind. Costs roughly 10x per-card encode time, so it
+# only makes sense when upload size matters more than generation speed.
+OXIPNG_REPACK = False
+
 # Colors
 PROMPT_BG_COLOR = (0, 0, 0)
 PROMPT_TEXT_COLOR = (255, 255, 255)
 RESPONSE_BG_COLOR = (255, 255, 255)
 RESPONSE_TEXT_COLOR = (0, 0, 0)
 
-def create_card(text, card_number, output_path, bg_color, text_color):
-    # Create image
-    image = Image.new('RGB', (CARD_WIDTH, CARD_HEIGHT), bg_color)
-    draw = ImageDraw.Draw(image)
-    
+@lru_cache(maxsize=None)
+def get_font(size):
+    """Load the card font at a given size, reusing one instance per size."""
     try:
-        main_font = ImageFont.truetype(MAIN_FONT, FONT_SIZE_MAIN)
-        number_font = ImageFont.truetype(MAIN_FONT, FONT_SIZE_NUMBER)
+        return ImageFont.truetype(MAIN_FONT, size)
     except OSError:
-        print("Arial Bold.ttf not found. Using default font.")
-        main_font = ImageFont.load_default()
-        number_font = ImageFont.load_default()
+        print(f"{MAIN_FONT} not found. Using default font.")
+        return ImageFont.load_default()
+
+@lru_cache(maxsize=None)
+def get_card_template(bg_color):
+    """Build the solid card background once per color; cards copy it.
+
+    Cards are pure black/white, so grayscale ('L') mode is used - a third
+    of the raster bytes of RGB, and a third as much PNG data to deflate.
+    """
+    return Image.new('L', (CARD_WIDTH, CARD_HEIGHT), bg_color[0])
 
-    # Calculate text wrapping
+@lru_cache(maxsize=None)
+def get_glyph(char, size):
+    """Rasterize one character once, returning its mask and pen advance.
+
+    The mask is rendered the same way draw.text would place the glyph
+    relative to the pen origin, so blitting masks at accumulated advances
+    reproduces a draw.text call (minus pair kerning, which Bitter-Bold
+    barely uses at these sizes).
+    """
+    font = get_font(size)
+    left, top, right, bottom = font.getbbox(char)
+    mask = Image.new('L', (max(right, 1), max(bottom, 1)), 0)
+    ImageDraw.Draw(mask).text((0, 0), char, font=font, fill=255)
+    return mask, font.getlength(char)
+
+def blit_text(image, xy, text, size, fill, draw=None):
+    """Draw a line of text by pasting cached glyph masks.
+
+    Falls back to the full ImageDraw.text shaping path for non-ASCII text,
+    where complex shaping could matter; callers that already hold a Draw
+    for the image can pass it in to avoid constructing one per line.
+    """
+    if not text.isascii():
+        if draw is None:
+            draw = ImageDraw.Draw(image)
+        draw.text(xy, text, font=get_font(size), fill=fill)
+        return
+    x, y = xy
+    # Bind the hot lookups to locals; the loop body below is the only
+    # per-glyph Python left - the actual pixel work happens in C paste
+    glyph = get_glyph
+    paste = image.paste
+    for char in text:
+        mask, advance = glyph(char, size)
+        if char != ' ':
+            paste(fill, (int(x), y), mask)
+        x += advance
+
+@lru_cache(maxsize=None)
+def get_qr_image(qr_image_path):
+    """Load and resize the QR code once per path.
+
+    QR modules are hard-edged squares, so BILINEAR is as good as LANCZOS
+    here and much cheaper.
+    """
+    qr_size = int(CARD_WIDTH * 0.4)
+    qr_image = Image.open(qr_image_path).convert('RGB')
+    return qr_image.resize((qr_size, qr_size), Image.Resampling.BILINEAR)
+
+def _warm_caches(bg_color):
+    """Warm the font and template caches before fanning out to threads."""
+    get_font(FONT_SIZE_MAIN)
+    get_font(FONT_SIZE_NUMBER)
+    get_card_template(bg_color)
+
+def wrap_text(text, font):
+    """Greedily wrap text to TEXT_BOX_WIDTH, measuring each word once."""
     words = text.split()
+    space_width = font.getlength(' ')
+    word_widths = [font.getlength(word) for word in words]
     lines = []
     current_line = []
-    
-    for word in words:
-        test_line = ' '.join(current_line + [word])
-        bbox = draw.textbbox((0, 0), test_line, font=main_font)
-        if bbox[2] - bbox[0] <= TEXT_BOX_WIDTH:
+    current_width = 0
+
+    for word, word_width in zip(words, word_widths):
+        test_width = current_width + space_width + word_width if current_line else word_width
+        if test_width <= TEXT_BOX_WIDTH:
             current_line.append(word)
+            current_width = test_width
         else:
             if current_line:
                 lines.append(' '.join(current_line))
             current_line = [word]
-    
+            current_width = word_width
+
     if current_line:
         lines.append(' '.join(current_line))
-    
-    # Draw main text with better spacing
+
+    return lines
+
+def _render_card_image(lines, card_number, bg_color, text_color):
+    """Rasterize pre-wrapped lines onto a card image."""
+    # Copy the shared background template (a single memcpy) instead of
+    # allocating and filling a fresh image per card
+    image = get_card_template(bg_color).copy()
+
+    # One Draw per card, and only if some line needs the shaping fallback;
+    # pure-ASCII cards never construct a Draw at all
+    draw = ImageDraw.Draw(image) if any(not line.isascii() for line in lines) else None
+
+    # Draw main text with better spacing, blitting cached glyph masks
     y = TEXT_BOX_TOP
     line_height = int(FONT_SIZE_MAIN * 1.4)  # Increased line height for better readability
-    
+
     for line in lines:
-        draw.text((MARGIN, y), line, font=main_font, fill=text_color)
+        blit_text(image, (MARGIN, y), line, FONT_SIZE_MAIN, text_color[0], draw)
         y += line_height
-    
-    # Draw card number in bottom right corner
-    number_bbox = draw.textbbox((0, 0), card_number, font=number_font)
-    number_width = number_bbox[2] - number_bbox[0]
+
+    # Draw card number in bottom right corner, sizing it from the cached
+    # per-glyph advances rather than a textbbox shaping call
+    number_width = int(sum(get_glyph(char, FONT_SIZE_NUMBER)[1] for char in card_number))
     number_x = CARD_WIDTH - number_width - MARGIN
     number_y = CARD_HEIGHT - MARGIN - FONT_SIZE_NUMBER
-    draw.text((number_x, number_y), card_number, font=number_font, fill=text_color)
-    
-    # Save image
-    image.save(output_path, 'PNG', dpi=(DPI, DPI))
+    blit_text(image, (number_x, number_y), card_number, FONT_SIZE_NUMBER, text_color[0])
 
-def create_card_back(output_path, bg_color, text_color):
-    """Create a card back with 'What Could Go Wrong?' text."""
-    # Create image with specified background color
-    image = Image.new('RGB', (CARD_WIDTH, CARD_HEIGHT), bg_color)
+    return image
+
+def render_card(lines, card_number, output_path, bg_color, text_color):
+    """Rasterize pre-wrapped lines onto a card and save it."""
+    image = _render_card_image(lines, card_number, bg_color, text_color)
+    image.save(output_path, 'PNG', compress_level=PNG_COMPRESS_LEVEL, optimize=False)
+
+def render_card_bytes(lines, card_number, bg_color, text_color):
+    """Rasterize a card and PNG-encode it in memory, returning the bytes.
+
+    With OXIPNG_REPACK enabled (and pyoxipng installed), Pillow's fast
+    level-1 output is recompressed by oxipng's Rust encoder - much
+    smaller files, at roughly 10x the per-card encode time.
+    """
+    image = _render_card_image(lines, card_number, bg_color, text_color)
+    buffer = io.BytesIO()
+    image.save(buffer, 'PNG', compress_level=PNG_COMPRESS_LEVEL, optimize=False)
+    data = buffer.getvalue()
+    if OXIPNG_REPACK and oxipng is not None:
+        data = oxipng.optimize_from_memory(data, level=0)
+    return data
+
+def create_card(text, card_number, output_path, bg_color, text_color):
+    """Wrap text and render a single card (layout + rasterization)."""
+    lines = wrap_text(text, get_font(FONT_SIZE_MAIN))
+    render_card(lines, card_number, output_path, bg_color, text_color)
+
+@lru_cache(maxsize=None)
+def _card_back_bytes(bg_color, text_color):
+    """Render and encode the fixed card back once per color scheme.
+
+    The back's text and layout are literal constants, so the whole PNG
+    can be baked and reused for any number of writes.
+    """
+    # Create grayscale image with specified background color
+    image = Image.new('L', (CARD_WIDTH, CARD_HEIGHT), bg_color[0])
     draw = ImageDraw.Draw(image)
-    
+
     # Use larger font size for card back
     larger_font_size = 96  # Increased size for card back
-    
-    try:
-        main_font = ImageFont.truetype(MAIN_FONT, larger_font_size)
-    except OSError:
-        print("Arial Bold.ttf not found. Using default font.")
-        main_font = ImageFont.load_default()
+
+    main_font = get_font(larger_font_size)
 
     # Force the text to split exactly as specified
     lines = ["What Could", "Go Wrong?"]
-    
+
     # Draw main text with better spacing
     y = TEXT_BOX_TOP
     line_height = int(larger_font_size * 1.4)  # Increased line height for better readability
-    
+
     for line in lines:
-        draw.text((MARGIN, y), line, font=main_font, fill=text_color)
+        draw.text((MARGIN, y), line, font=main_font, fill=text_color[0])
         y += line_height
-    
-    # Save image
-    image.save(output_path, 'PNG', dpi=(DPI, DPI))
+
+    buffer = io.BytesIO()
+    image.save(buffer, 'PNG', compress_level=PNG_COMPRESS_LEVEL, optimize=False)
+    return buffer.getvalue()
+
+def create_card_back(output_path, bg_color, text_color):
+    """Create a card back with 'What Could Go Wrong?' text."""
+    _write_file(output_path, _card_back_bytes(bg_color, text_color))
 
 def create_instruction_card(qr_image_path, url, output_path):
     """Create a special instruction card with QR code and URL."""
     # Create image with white background
     image = Image.new('RGB', (CARD_WIDTH, CARD_HEIGHT), RESPONSE_BG_COLOR)
-    draw = ImageDraw.Draw(image)
-    
-    try:
-        # Load fonts
-        title_font = ImageFont.truetype(MAIN_FONT, 84)  # Larger font for title
-        url_font = ImageFont.truetype(MAIN_FONT, 48)    # Smaller font for URL
-    except OSError:
-        print(f"{MAIN_FONT} not found. Using default font.")
-        title_font = ImageFont.load_default()
-        url_font = ImageFont.load_default()
-    
-    # Load and resize QR code
+
+    # Load fonts (shared via the module-level cache)
+    title_font = get_font(84)  # Larger font for title
+    url_font = get_font(48)    # Smaller font for URL
+
+    # QR code size (about 1/3 of card width)
+    qr_size = int(CARD_WIDTH * 0.4)
+
+    # Load the pre-resized QR code from the cache
     try:
-        qr_image = Image.open(qr_image_path)
-        # Calculate QR code size (about 1/3 of card width)
-        qr_size = int(CARD_WIDTH * 0.4)
-        qr_image = qr_image.resize((qr_size, qr_size), Image.Resampling.LANCZOS)
-        
+        qr_image = get_qr_image(qr_image_path)
+
         # Calculate QR code position (center horizontally and vertically)
         qr_x = (CARD_WIDTH - qr_size) // 2
         qr_y = (CARD_HEIGHT - qr_size) // 2  # True center of the card
-        
-        # Paste QR code onto the card
-        image.paste(qr_image, (qr_x, qr_y))
-        
+
+        # Composite the QR code onto the card - as a vectorized slice
+        # assignment when numpy is available, else via PIL's paste
+        if np is not None:
+            arr = np.array(image)
+            arr[qr_y:qr_y + qr_size, qr_x:qr_x + qr_size] = np.asarray(qr_image)
+            image = Image.fromarray(arr)
+        else:
+            image.paste(qr_image, (qr_x, qr_y))
+
     except Exception as e:
         print(f"Error loading QR code: {e}")
         # If QR code fails, we'll still create the card with text
+
+    draw = ImageDraw.Draw(image)
     
     # Use the QR code position for other elements
     qr_y = (CARD_HEIGHT - qr_size) // 2
@@ -166,20 +300,23 @@ def create_instruction_card(qr_image_path, url, output_path):
     
     # If URL is too long, wrap it
     if url_width > TEXT_BOX_WIDTH:
-        # Simple character-based wrapping to preserve exact URL
+        # Simple character-based wrapping to preserve exact URL,
+        # accumulating per-character widths instead of re-measuring the line
         lines = []
         current_line = ""
-        
+        current_width = 0
+
         for char in url:
-            test_line = current_line + char
-            bbox = draw.textbbox((0, 0), test_line, font=url_font)
-            if bbox[2] - bbox[0] <= TEXT_BOX_WIDTH:
-                current_line = test_line
+            char_width = url_font.getlength(char)
+            if current_width + char_width <= TEXT_BOX_WIDTH:
+                current_line += char
+                current_width += char_width
             else:
                 if current_line:
                     lines.append(current_line)
                 current_line = char
-        
+                current_width = char_width
+
         if current_line:
             lines.append(current_line)
         
@@ -197,31 +334,68 @@ def create_instruction_card(qr_image_path, url, output_path):
         draw.text((url_x, url_y), url, font=url_font, fill=RESPONSE_TEXT_COLOR)
     
     # Save image
-    image.save(output_path, 'PNG', dpi=(DPI, DPI))
+    image.save(output_path, 'PNG', compress_level=PNG_COMPRESS_LEVEL, optimize=False)
 
-def process_row(row, output_dir, bg_color, text_color):
-    """Process a single row from the CSV file."""
-    if len(row) >= 2:
-        text, card_number = row[0], row[1]
-        output_path = os.path.join(output_dir, f'{card_number}.png')
-        create_card(text, card_number, output_path, bg_color, text_color)
+def iter_csv_rows(filename):
+    """Yield (text, card_number) rows, skipping the header.
 
-def process_csv(filename, output_dir, bg_color, text_color):
+    Uses pandas' C parser when it is installed (one bulk read, columns
+    validated up front); otherwise streams through the stdlib csv reader.
+    """
+    if pd is not None:
+        df = pd.read_csv(filename, usecols=[0, 1], header=0, dtype=str,
+                         na_filter=False, engine='c')
+        yield from df.itertuples(index=False, name=None)
+    else:
+        with open(filename, 'r', encoding='utf-8', buffering=1 << 20) as file:
+            reader = csv.reader(file)
+            next(reader)  # Skip header
+            for row in reader:
+                if len(row) >= 2:
+                    yield row[0], row[1]
+
+def iter_deck_tasks(filename, output_dir, bg_color, text_color):
+    """Yield render-ready tasks for one deck, wrapping text as we go."""
     os.makedirs(output_dir, exist_ok=True)
-    with open(filename, 'r', encoding='utf-8') as file:
-        reader = csv.reader(file)
-        next(reader)  # Skip header
-        rows = list(reader)
+    _warm_caches(bg_color)
+    main_font = get_font(FONT_SIZE_MAIN)
+    prefix = output_dir + os.sep
+    # Wrap text in the dispatching thread so the workers only rasterize
+    for text, card_number in iter_csv_rows(filename):
+        yield wrap_text(text, main_font), card_number, prefix + card_number + '.png', bg_color, text_color
+
+def _render_task(task):
+    lines, card_number, output_path, bg_color, text_color = task
+    return output_path, render_card_bytes(lines, card_number, bg_color, text_color)
+
+def _write_file(path, data):
+    with open(path, 'wb') as file:
+        file.write(data)
 
-    # Create a partial function with fixed arguments
-    process_func = partial(process_row, 
-                         output_dir=output_dir, 
-                         bg_color=bg_color, 
-                         text_color=text_color)
+def process_decks(decks):
+    """Render several (filename, output_dir, bg_color, text_color) decks
+    as one work stream through a single pool session."""
+    tasks = chain.from_iterable(iter_deck_tasks(*deck) for deck in decks)
 
-    # Use all available CPU cores
-    with multiprocessing.Pool() as pool:
-        pool.map(process_func, rows)
+    # Stream tasks into the pool so rendering starts while the CSVs are
+    # still being read. Pillow's C imaging ops release the GIL, so threads
+    # parallelize the rendering without fork/pickle overhead and share the
+    # caches above. Workers encode PNGs in memory and a dedicated writer
+    # thread handles the disk I/O, so encoders never block on the disk.
+    with ThreadPoolExecutor(max_workers=os.cpu_count()) as executor, \
+            ThreadPoolExecutor(max_workers=1) as writer:
+        pending = []
+        for output_path, data in executor.map(_render_task, tasks):
+            pending.append(writer.submit(_write_file, output_path, data))
+            # Drain completed writes as we go so failures surface promptly
+            # and finished buffers don't pile up in memory
+            while pending and pending[0].done():
+                pending.pop(0).result()
+        for future in pending:
+            future.result()
+
+def process_csv(filename, output_dir, bg_color, text_color):
+    process_decks([(filename, output_dir, bg_color, text_color)])
 
 def main():
     # Create main directory structure
@@ -229,8 +403,11 @@ def main():
     os.makedirs('CARD IMAGES/PROMPT', exist_ok=True)
     os.makedirs('CARD IMAGES/RESPONSE', exist_ok=True)
     
-    process_csv('prompts-ai.csv', 'CARD IMAGES/PROMPT', PROMPT_BG_COLOR, PROMPT_TEXT_COLOR)
-    process_csv('responses-ai.csv', 'CARD IMAGES/RESPONSE', RESPONSE_BG_COLOR, RESPONSE_TEXT_COLOR)
+    # Render both decks through one pool session
+    process_decks([
+        ('prompts-ai.csv', 'CARD IMAGES/PROMPT', PROMPT_BG_COLOR, PROMPT_TEXT_COLOR),
+        ('responses-ai.csv', 'CARD IMAGES/RESPONSE', RESPONSE_BG_COLOR, RESPONSE_TEXT_COLOR),
+    ])
     
     # Create card backs
     create_card_back('CARD IMAGES/prompt_back_black.png', PROMPT_BG_COLOR, PROMPT_TEXT_COLOR)
@@ -240,5 +417,4 @@ def main():
     create_instruction_card('wcgw-instructions-qr.png', 'https://nikmartelaro.com/what-could-go-wrong-ai/', 'CARD IMAGES/instructions.png')
 
 if __name__ == '__main__':
-    # This guard is important for multiprocessing on Windows
     main() 
\ No newline at end of file